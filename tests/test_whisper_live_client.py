@@ -0,0 +1,254 @@
+import json
+import threading
+import time
+import unittest
+from collections import deque
+from unittest.mock import patch, MagicMock
+
+import websocket
+from whisper_live_client import EnhancedClient, END_OF_AUDIO
+
+
+class BaseTestCase(unittest.TestCase):
+    @patch('whisper_live.client.websocket.WebSocketApp')
+    def setUp(self, mock_websocket):
+        self.mock_ws_app = mock_websocket.return_value
+        self.mock_ws_app.send = MagicMock()
+
+        self.client = EnhancedClient('localhost', 9090, 'en', log_transcription=False)
+        self.client.on_open(self.mock_ws_app)
+        self.client.on_message(self.mock_ws_app, json.dumps({
+            "uid": self.client.uid,
+            "message": "SERVER_READY",
+            "backend": "faster_whisper"
+        }))
+        self.mock_ws_app.send.reset_mock()
+
+        self.mock_websocket = mock_websocket
+        self.mock_audio_packet = b'\x00' * 16384
+
+    def tearDown(self):
+        self.client.on_close(self.mock_ws_app, 1000, "Normal closure")
+        self.client.close_websocket()
+        del self.client
+
+    def sent_payloads(self):
+        return [call[0][0] for call in self.mock_ws_app.send.call_args_list]
+
+    def wait_for_sends(self, count, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        while self.mock_ws_app.send.call_count < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+
+class TestSendBuffer(BaseTestCase):
+    def test_paced_packets_are_not_delayed(self):
+        self.client.SEND_BUFFER_MAX_DELAY = 0.5
+
+        self.client.send_packet_to_server(self.mock_audio_packet)
+        self.wait_for_sends(1, timeout=0.2)
+
+        self.assertEqual(self.sent_payloads(), [self.mock_audio_packet])
+
+    def test_burst_is_coalesced(self):
+        for _ in range(4):
+            self.client.send_packet_to_server(self.mock_audio_packet)
+        self.wait_for_sends(2)
+
+        # The first packet goes out alone, the rest of the burst waits for the delay limit
+        self.assertEqual(self.sent_payloads(), [self.mock_audio_packet, self.mock_audio_packet * 3])
+        self.mock_ws_app.send.assert_called_with(self.mock_audio_packet * 3, websocket.ABNF.OPCODE_BINARY)
+
+    def test_full_buffer_is_sent_as_one_frame(self):
+        self.client.SEND_BUFFER_MAX_DELAY = 0.5
+
+        for _ in range(5):
+            self.client.send_packet_to_server(self.mock_audio_packet)
+        self.wait_for_sends(2, timeout=0.2)
+
+        self.assertEqual(self.sent_payloads(), [self.mock_audio_packet, self.mock_audio_packet * 4])
+
+    def test_end_of_audio_follows_buffered_audio(self):
+        self.client.send_packet_to_server(self.mock_audio_packet)
+        self.client.send_packet_to_server(END_OF_AUDIO)
+        self.wait_for_sends(2)
+
+        self.assertEqual(self.sent_payloads(), [self.mock_audio_packet, END_OF_AUDIO])
+
+
+class TestSegments(BaseTestCase):
+    def segments_message(self, segments):
+        return json.dumps({"uid": self.client.uid, "segments": segments})
+
+    def test_segments_are_added_to_transcript(self):
+        message = self.segments_message([
+            {"start": "0.000", "end": "1.000", "text": "Test transcript", "completed": True},
+            {"start": "1.000", "end": "2.000", "text": "Test transcript 2", "completed": False},
+        ])
+        self.client.on_message(self.mock_ws_app, message)
+
+        self.assertEqual(self.client.transcript, [
+            {"start": 0.0, "end": 1.0, "text": "Test transcript", "completed": True}
+        ])
+        self.assertEqual(self.client.last_segment["text"], "Test transcript 2")
+        self.assertEqual(self.client.last_text, "Test transcript 2")
+
+    def test_duplicate_frame_is_skipped(self):
+        message = self.segments_message([
+            {"start": "0.000", "end": "1.000", "text": "Test transcript", "completed": True},
+        ])
+        self.client.on_message(self.mock_ws_app, message)
+        with patch('whisper_live_client.SegmentBuffer.fill') as mock_fill:
+            self.client.on_message(self.mock_ws_app, message)
+            mock_fill.assert_not_called()
+
+
+class TestServerMessages(BaseTestCase):
+    def send_message(self, **fields):
+        fields.setdefault("uid", self.client.uid)
+        self.client.on_message(self.mock_ws_app, json.dumps(fields))
+
+    def test_wait_with_int_message(self):
+        self.send_message(status="WAIT", message=3)
+        self.assertTrue(self.client.waiting)
+
+    def test_wait_with_float_message(self):
+        self.send_message(status="WAIT", message=2.5)
+        self.assertTrue(self.client.waiting)
+
+    def test_error_status(self):
+        self.send_message(status="ERROR", message="Failed to load model")
+        self.assertTrue(self.client.server_error)
+
+    def test_invalid_uid_is_ignored(self):
+        self.send_message(uid="other-client", language="fr", language_prob=0.9)
+        self.assertEqual(self.client.language, "en")
+
+    def test_language_detection(self):
+        self.send_message(language="fr", language_prob=0.9)
+        self.assertEqual(self.client.language, "fr")
+
+    def test_disconnect(self):
+        self.assertTrue(self.client.recording)
+        self.send_message(message="DISCONNECT")
+        self.assertFalse(self.client.recording)
+
+
+class TestInitialConfig(BaseTestCase):
+    def test_config_is_rebuilt_after_language_detection(self):
+        self.client.on_open(self.mock_ws_app)
+        payload = self.mock_ws_app.send.call_args[0][0]
+        self.assertIs(payload, self.client._config_payload)
+        self.assertEqual(json.loads(payload)["language"], "en")
+
+        self.client.on_message(self.mock_ws_app, json.dumps({
+            "uid": self.client.uid,
+            "language": "fr",
+            "language_prob": 0.9
+        }))
+        self.client.on_open(self.mock_ws_app)
+
+        config = json.loads(self.mock_ws_app.send.call_args[0][0])
+        self.assertEqual(config["language"], "fr")
+        self.assertEqual(config["uid"], self.client.uid)
+
+
+class TestConsoleOutput(BaseTestCase):
+    @patch('whisper_live_client.utils.print_transcript')
+    @patch('whisper_live_client.utils.clear_screen')
+    def test_slow_redraw_does_not_block_audio(self, mock_clear_screen, mock_print_transcript):
+        redrawing = threading.Event()
+        release = threading.Event()
+
+        def slow_clear_screen():
+            redrawing.set()
+            release.wait()
+        mock_clear_screen.side_effect = slow_clear_screen
+        self.client.log_transcription = True
+
+        self.client.on_message(self.mock_ws_app, json.dumps({
+            "uid": self.client.uid,
+            "segments": [{"start": "0.000", "end": "1.000", "text": "Test transcript", "completed": False}]
+        }))
+        self.assertTrue(redrawing.wait(1.0))
+
+        self.client.send_packet_to_server(self.mock_audio_packet)
+        self.wait_for_sends(1)
+        release.set()
+
+        self.assertEqual(self.sent_payloads(), [self.mock_audio_packet])
+
+
+class TestBackpressure(BaseTestCase):
+    def test_unpaced_source_is_not_dropped(self):
+        self.mock_ws_app.send.side_effect = lambda *args: time.sleep(0.0005)
+
+        for _ in range(400):
+            self.client.send_packet_to_server(self.mock_audio_packet)
+        self.client.send_packet_to_server(END_OF_AUDIO)
+        self.client.close_websocket()
+
+        payloads = self.sent_payloads()
+        self.assertEqual(self.client.dropped_packets, 0)
+        self.assertEqual(payloads[-1], END_OF_AUDIO)
+        self.assertEqual(sum(len(p) for p in payloads[:-1]), 400 * len(self.mock_audio_packet))
+
+    def test_live_audio_is_dropped_when_stalled(self):
+        release = threading.Event()
+        self.mock_ws_app.send.side_effect = lambda *args: release.wait()
+        self.client.drop_on_backpressure = True
+
+        for _ in range(100):
+            self.client.send_packet_to_server(self.mock_audio_packet)
+
+        self.assertGreater(self.client.dropped_packets, 0)
+        self.assertLessEqual(self.client._queued_bytes,
+                             self.client.SEND_QUEUE_MAX_BYTES + len(self.mock_audio_packet))
+        release.set()
+
+    def test_dropped_packets_are_not_logged_as_sent(self):
+        self.client.debug = True
+        self.client.packet_times = deque(maxlen=128)
+        self.client._log_enabled = lambda level: True
+        self.client._log_info = MagicMock()
+        self.client.drop_on_backpressure = True
+        self.client._queued_bytes = self.client.SEND_QUEUE_MAX_BYTES + 1
+
+        for _ in range(100):
+            self.client.send_packet_to_server(self.mock_audio_packet)
+
+        self.assertEqual(self.client.dropped_packets, 100)
+        self.assertEqual(self.client.packet_count, 0)
+        self.client._log_info.assert_not_called()
+        self.client._queued_bytes = 0
+
+
+class TestCloseWebsocket(BaseTestCase):
+    def test_close_sends_queued_audio_first(self):
+        order = []
+        self.mock_ws_app.send.side_effect = lambda *args: order.append("send")
+        self.mock_ws_app.close.side_effect = lambda: order.append("close")
+
+        self.client.send_packet_to_server(self.mock_audio_packet)
+        self.client.send_packet_to_server(END_OF_AUDIO)
+        self.client.close_websocket()
+
+        self.assertEqual(order[:3], ["send", "send", "close"])
+
+    def test_close_does_not_hang_on_stalled_socket(self):
+        closed = threading.Event()
+        self.mock_ws_app.send.side_effect = lambda *args: closed.wait()
+        self.mock_ws_app.close.side_effect = closed.set
+        self.client.CLOSE_DRAIN_TIMEOUT = 0.1
+
+        self.client.send_packet_to_server(self.mock_audio_packet * 4)
+        self.client.send_packet_to_server(END_OF_AUDIO)
+
+        start = time.monotonic()
+        self.client.close_websocket()
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.mock_ws_app.close.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
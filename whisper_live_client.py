@@ -18,13 +18,21 @@ Example:
 """
 
 import argparse
+import array
 import os
+import socket
+import sys
 import time
 import threading
 import logging
-import json
+from collections import deque
+from typing import List, Optional, Union
+
+import msgspec
+import orjson
 import websocket
 from whisper_live.client import TranscriptionClient, Client
+import whisper_live.utils as utils
 
 # Set up logging
 logging.basicConfig(
@@ -36,84 +44,255 @@ logger = logging.getLogger('whisper_live_client')
 # Disable websocket debug logging - we only want to log what we receive
 websocket.enableTrace(False)
 
+END_OF_AUDIO = Client.END_OF_AUDIO.encode('utf-8')
+
+
+class SegmentMsg(msgspec.Struct):
+    """A single transcript segment as sent by the server."""
+    text: str = ""
+    start: Union[str, float] = "0.000"
+    end: Union[str, float] = "0.000"
+    completed: bool = False
+
+
+class SegmentBuffer:
+    """
+    Struct-of-arrays copy of the segments in the latest server frame.
+
+    The buffer is cleared and refilled for every frame rather than reallocated.
+    """
+    __slots__ = ("texts", "starts", "ends", "completed")
+
+    def __init__(self):
+        self.texts = []
+        self.starts = array.array('d')
+        self.ends = array.array('d')
+        self.completed = []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def fill(self, segments):
+        """Replace the buffer contents with the given SegmentMsg structs."""
+        self.texts.clear()
+        self.texts.extend(seg.text for seg in segments)
+        del self.starts[:]
+        self.starts.extend(float(seg.start) for seg in segments)
+        del self.ends[:]
+        self.ends.extend(float(seg.end) for seg in segments)
+        self.completed.clear()
+        self.completed.extend(seg.completed for seg in segments)
+
+    def segment_at(self, i):
+        """Return segment i as a dict, the format expected by write_srt_file."""
+        return {
+            "start": self.starts[i],
+            "end": self.ends[i],
+            "text": self.texts[i],
+            "completed": self.completed[i],
+        }
+
+
+class ServerMsg(msgspec.Struct):
+    """Any frame sent by the server; fields not present in the frame stay None."""
+    uid: Optional[str] = None
+    status: Optional[str] = None
+    # Free text, or the estimated wait time in minutes for a WAIT status
+    message: Union[str, float, None] = None
+    backend: Optional[str] = None
+    language: Optional[str] = None
+    language_prob: Optional[float] = None
+    segments: Optional[List[SegmentMsg]] = None
+
+
 class EnhancedClient(Client):
     """Enhanced client that prints transcription results in real-time."""
+
+    # Audio arriving in a burst is coalesced into a single binary frame until either limit
+    # is hit. A packet arriving more than SEND_BUFFER_MAX_DELAY after the last queued frame
+    # is queued straight away, so real-time microphone and file chunks (16 KiB every
+    # ~256ms) are not delayed; only faster than real time sources, such as the HLS/RTSP
+    # av streams, get merged.
+    SEND_BUFFER_MAX_BYTES = 4 * 16384
+    SEND_BUFFER_MAX_DELAY = 0.02
+    # At most this much audio waits to be written. Beyond it, live microphone audio is
+    # dropped and other sources block until the flusher catches up. Live audio is also
+    # dropped while the socket has not accepted a write for SEND_STALL_TIMEOUT seconds.
+    SEND_QUEUE_MAX_BYTES = 256 * 1024
+    SEND_STALL_TIMEOUT = 0.5
+    # close_websocket waits at most this long for queued audio to be written
+    CLOSE_DRAIN_TIMEOUT = 2.0
+    # Console output from the websocket thread is written at most this often
+    OUTPUT_FLUSH_INTERVAL = 0.1
+
+    _decoder = msgspec.json.Decoder(ServerMsg)
     
     def __init__(self, *args, **kwargs):
         self.debug = kwargs.pop('debug', False)
+        # Set up the send buffer before the parent starts the websocket thread
+        self._send_buf = bytearray()
+        self._send_deadline = None
+        self._last_queued = 0.0
+        self._send_lock = threading.Lock()
+        # Notified by the flusher as queued frames are written
+        self._send_space = threading.Condition(self._send_lock)
+        # Frames ready to go out; only the flusher thread (or close_websocket) writes them
+        self._send_queue = deque()
+        self._send_wakeup = threading.Event()
+        self._write_lock = threading.Lock()
+        # Set by the flusher whenever it has emptied the send queue
+        self._send_drained = threading.Event()
+        self._send_drained.set()
+        self._flusher_thread = None
+        self._queued_bytes = 0
+        self._last_drain = time.monotonic()
+        self.dropped_packets = 0
+        # Set while recording from the microphone, where late audio is worth less than latency
+        self.drop_on_backpressure = False
+        self._flush_stop = threading.Event()
+        self._loads = orjson.loads
+        self._log_info = logger.info
+        self._log_enabled = logger.isEnabledFor
+        # Console output is appended here by the websocket thread and written by the flusher;
+        # deque append/popleft are thread-safe, and only the newest transcript redraw is kept
+        self._out_buf = deque()
+        self._pending_redraw = deque(maxlen=1)
+        self._out_lock = threading.Lock()
+        self._output_stop = threading.Event()
+        self.ready_event = threading.Event()
+        self._config_payload = None
         super().__init__(*args, **kwargs)
         self.connected = False
         self.last_text = ""
+        self._last_segments_hash = None
+        self.segment_buffer = SegmentBuffer()
         self.packet_count = 0
-        self.last_packet_time = time.time()
+        self.last_packet_time = time.monotonic()
+        # Send timestamps of the most recent packets, only tracked for the debug log
+        self.packet_times = deque(maxlen=128) if self.debug else None
+        if self._config_payload is None:
+            self._config_payload = self._build_config_payload()
         
     def on_message(self, ws, message):
         """Override to print transcription results in real-time."""
-        if self.debug:
-            try:
-                # Try to parse as JSON for pretty printing
-                parsed = json.loads(message)
-                if "segments" in parsed:
-                    # Don't log the full segments as they can be large
-                    segment_count = len(parsed["segments"])
-                    parsed["segments"] = f"[{segment_count} segments]"
-                logger.info(f"RECEIVED FROM SERVER: {json.dumps(parsed, indent=2)}")
-            except:
-                # If not JSON, it's probably binary data
-                logger.info(f"RECEIVED FROM SERVER: Binary data, length: {len(message)}")
-        
         try:
-            message_obj = json.loads(message)
-            
-            if self.uid != message_obj.get("uid"):
+            if self.debug and self._log_enabled(logging.INFO):
+                if isinstance(message, (bytes, bytearray)) and not message.startswith((b"{", b"[")):
+                    self._log_info("RECEIVED FROM SERVER: Binary data, length: %d", len(message))
+                else:
+                    parsed = self._loads(message)
+                    if "segments" in parsed:
+                        # Don't log the full segments as they can be large
+                        segment_count = len(parsed["segments"])
+                        parsed["segments"] = f"[{segment_count} segments]"
+                    pretty = orjson.dumps(parsed, option=orjson.OPT_INDENT_2).decode()
+                    self._log_info("RECEIVED FROM SERVER: %s", pretty)
+
+            # Parse and type the frame in one pass instead of building a dict tree
+            msg = self._decoder.decode(message)
+
+            if self.uid != msg.uid:
                 print("[ERROR]: invalid client uid")
                 return
 
-            if "status" in message_obj.keys():
-                self.handle_status_messages(message_obj)
+            if msg.status is not None:
+                self.handle_status_messages({"status": msg.status, "message": msg.message})
                 return
 
-            if "message" in message_obj.keys() and message_obj["message"] == "DISCONNECT":
+            if msg.message == "DISCONNECT":
                 print("[INFO]: Server disconnected due to overtime.")
                 self.recording = False
 
-            if "message" in message_obj.keys() and message_obj["message"] == "SERVER_READY":
+            if msg.message == "SERVER_READY":
                 self.last_response_received = time.time()
                 self.recording = True
                 self.connected = True
-                self.server_backend = message_obj["backend"]
+                self.server_backend = msg.backend
+                self.ready_event.set()
                 print(f"[SUCCESS]: Connected to server! Running with backend {self.server_backend}")
                 return
 
-            if "language" in message_obj.keys():
-                self.language = message_obj.get("language")
-                lang_prob = message_obj.get("language_prob")
+            if msg.language is not None:
+                self.language = msg.language
+                # The initial config carries the language, so re-serialize it on reconnect
+                self._config_payload = None
                 print(
-                    f"[INFO]: Server detected language {self.language} with probability {lang_prob}"
+                    f"[INFO]: Server detected language {self.language} with probability {msg.language_prob}"
                 )
                 return
 
-            if "segments" in message_obj.keys():
-                segments = message_obj["segments"]
-                if segments:
-                    # Print only the new text from the latest segment
-                    latest_segment = segments[-1]
-                    if latest_segment.get("text") and latest_segment.get("text") != self.last_text:
-                        self.last_text = latest_segment.get("text")
-                        print(f"\n[TRANSCRIPTION]: {self.last_text}")
-                self.process_segments(segments)
+            if msg.segments is not None:
+                self.handle_segments(msg.segments)
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
+            logger.error("Error processing message: %s", e)
+
+    def handle_segments(self, segments):
+        """Prints the latest transcription and processes the received segments."""
+        if not segments:
+            return
+        latest_segment = segments[-1]
+        text = latest_segment.text
+        last_text = self.last_text
+        # The server keeps re-sending the same rolling hypothesis while the
+        # speaker is silent; there is nothing new to process in that case.
+        if text == last_text and not latest_segment.completed:
+            return
+        segments_hash = hash(tuple((s.start, s.end, s.text, s.completed) for s in segments))
+        if segments_hash == self._last_segments_hash:
+            return
+        self._last_segments_hash = segments_hash
+        buf = self.segment_buffer
+        buf.fill(segments)
+
+        # Print only the new text from the latest segment
+        if text and text != last_text:
+            self.last_text = text
+            self._out_buf.append(f"\n[TRANSCRIPTION]: {text}\n")
+        self.process_segments(buf)
+
+    def process_segments(self, segments):
+        """
+        Processes transcript segments held in a SegmentBuffer.
+
+        Segments kept for the SRT output are converted to dicts, which is what
+        write_srt_file expects.
+        """
+        texts = segments.texts
+        completed = segments.completed
+        last = len(segments) - 1
+        text = []
+        for i, seg_text in enumerate(texts):
+            if not text or text[-1] != seg_text:
+                text.append(seg_text)
+                if i == last and not completed[i]:
+                    self.last_segment = segments.segment_at(i)
+                elif (self.server_backend == "faster_whisper" and completed[i] and
+                      (not self.transcript or
+                        segments.starts[i] >= float(self.transcript[-1]['end']))):
+                    self.transcript.append(segments.segment_at(i))
+        # update last received segment and last valid response time
+        if self.last_received_segment is None or self.last_received_segment != texts[-1]:
+            self.last_response_received = time.time()
+            self.last_received_segment = texts[-1]
+
+        if self.log_transcription:
+            # Truncate to last 3 entries for brevity. The redraw itself is done by the
+            # flusher thread, so clearing the screen never blocks the websocket thread.
+            self._pending_redraw.append(text[-3:])
     
     def on_error(self, ws, error):
-        logger.error(f"WebSocket Error: {error}")
+        logger.error("WebSocket Error: %s", error)
         print(f"[ERROR] WebSocket Error: {error}")
         self.server_error = True
         self.error_message = error
 
     def on_close(self, ws, close_status_code, close_msg):
-        logger.info(f"WebSocket connection closed: {close_status_code}: {close_msg}")
+        logger.info("WebSocket connection closed: %s: %s", close_status_code, close_msg)
         print(f"[INFO]: WebSocket connection closed: {close_status_code}: {close_msg}")
+        self._flush_stop.set()
+        self._output_stop.set()
+        self._send_wakeup.set()
+        self._flush_output()
         self.recording = False
         self.waiting = False
         
@@ -123,6 +302,34 @@ class EnhancedClient(Client):
         print("[INFO]: WebSocket connection opened")
         
         # Send initial configuration
+        if self._config_payload is None:
+            self._config_payload = self._build_config_payload()
+        if self.debug:
+            logger.info("Sending initial config to server")
+        ws.send(self._config_payload)
+        self._last_drain = time.monotonic()
+        self._enable_nagle(ws)
+        self._start_send_flusher()
+        self._start_output_flusher()
+
+    def _enable_nagle(self, ws):
+        """
+        Turn TCP_NODELAY back off on the underlying socket.
+
+        websocket-client enables TCP_NODELAY by default, which pushes every frame out
+        immediately. The client only uploads audio, so letting the kernel coalesce small
+        writes is worth the extra latency.
+        """
+        sock = getattr(getattr(ws, "sock", None), "sock", None)
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+        except OSError as e:
+            logger.error("Error disabling TCP_NODELAY: %s", e)
+
+    def _build_config_payload(self):
+        """Serialize the initial configuration message sent to the server."""
         config = {
             "uid": self.uid,
             "language": self.language,
@@ -132,27 +339,183 @@ class EnhancedClient(Client):
             "max_clients": self.max_clients,
             "max_connection_time": self.max_connection_time,
         }
-        if self.debug:
-            logger.info(f"Sending initial config to server")
-        ws.send(json.dumps(config))
-        
+        return orjson.dumps(config)
+
+    def _start_send_flusher(self):
+        """
+        Start the thread that writes queued audio frames to the socket.
+
+        The audio capture thread only appends to the send buffer, so it never blocks on
+        the network. The flusher wakes up as soon as a frame is queued, or every 10ms to
+        queue stale buffered audio.
+        """
+        # Stop the flusher left over from a previous connection, if any
+        self._flush_stop.set()
+        self._flush_stop = threading.Event()
+
+        def flusher(stop):
+            wakeup = self._send_wakeup
+            while not stop.is_set():
+                wakeup.wait(0.01)
+                wakeup.clear()
+                now = time.monotonic()
+                with self._send_lock:
+                    if self._send_buf and now >= self._send_deadline:
+                        self._queue_send_buffer()
+                self._drain_send_queue()
+
+        thread = threading.Thread(target=flusher, args=(self._flush_stop,))
+        thread.daemon = True
+        thread.start()
+        self._flusher_thread = thread
+
+    def _start_output_flusher(self):
+        """
+        Start the thread that writes buffered console output every OUTPUT_FLUSH_INTERVAL.
+
+        It is separate from the send flusher so a slow terminal never holds up audio.
+        """
+        self._output_stop.set()
+        self._output_stop = threading.Event()
+
+        def output_flusher(stop):
+            while not stop.wait(self.OUTPUT_FLUSH_INTERVAL):
+                self._flush_output()
+
+        thread = threading.Thread(target=output_flusher, args=(self._output_stop,))
+        thread.daemon = True
+        thread.start()
+
+    def _flush_output(self):
+        """Write any buffered console output and the latest transcript redraw to stdout."""
+        with self._out_lock:
+            out_buf = self._out_buf
+            lines = []
+            while out_buf:
+                lines.append(out_buf.popleft())
+            if lines:
+                sys.stdout.write("".join(lines))
+                sys.stdout.flush()
+            try:
+                text = self._pending_redraw.popleft()
+            except IndexError:
+                return
+            utils.clear_screen()
+            utils.print_transcript(text)
+
+    def _queue_send_buffer(self):
+        """Queue any buffered audio as one binary frame. Caller must hold the send lock."""
+        if not self._send_buf:
+            return
+        self._send_drained.clear()
+        self._send_queue.append(bytes(self._send_buf))
+        self._send_buf.clear()
+        self._send_deadline = None
+        self._last_queued = time.monotonic()
+
+    def _drain_send_queue(self):
+        """Write all queued frames to the socket, in order."""
+        with self._write_lock:
+            while True:
+                with self._send_lock:
+                    if not self._send_queue:
+                        self._last_drain = time.monotonic()
+                        self._send_drained.set()
+                        return
+                    payload = self._send_queue.popleft()
+                    self._queued_bytes -= len(payload)
+                    self._send_space.notify_all()
+                try:
+                    self.client_socket.send(payload, websocket.ABNF.OPCODE_BINARY)
+                except Exception as e:
+                    logger.error("Error sending packet: %s", e)
+                    print(f"[ERROR]: Failed to send audio packet: {e}")
+
+    def close_websocket(self):
+        """
+        Give the flusher up to CLOSE_DRAIN_TIMEOUT seconds to send any audio still
+        buffered, then close the WebSocket connection.
+
+        The socket is always closed, even if the server has stopped reading: closing
+        it is what unblocks a flusher stuck in send().
+        """
+        with self._send_lock:
+            self._queue_send_buffer()
+        flusher = self._flusher_thread
+        if flusher is not None and flusher.is_alive() and not self._flush_stop.is_set():
+            self._send_wakeup.set()
+            if not self._send_drained.wait(self.CLOSE_DRAIN_TIMEOUT):
+                logger.error("Closing with unsent audio still queued")
+        super().close_websocket()
+
     def send_packet_to_server(self, message):
-        """Send an audio packet to the server using WebSocket."""
+        """
+        Send an audio packet to the server using WebSocket.
+
+        A packet that arrives more than SEND_BUFFER_MAX_DELAY after the last queued
+        frame is queued for the flusher thread right away. Packets arriving in a burst
+        are coalesced and queued once SEND_BUFFER_MAX_BYTES have accumulated or the
+        oldest buffered packet is SEND_BUFFER_MAX_DELAY seconds old. Control packets such as END_OF_AUDIO queue
+        the buffered audio and are then queued on their own.
+
+        If the server is not keeping up (see SEND_QUEUE_MAX_BYTES and
+        SEND_STALL_TIMEOUT), live microphone audio (drop_on_backpressure) is dropped
+        instead of queued, so latency does not grow without bound; dropped_packets
+        counts them. Other sources block until there is room in the queue, so no
+        audio is lost.
+        """
         try:
-            self.packet_count += 1
-            now = time.time()
-            
+            with self._send_lock:
+                if message == END_OF_AUDIO:
+                    self._queue_send_buffer()
+                    self._send_queue.append(message)
+                    self._send_drained.clear()
+                    self._queued_bytes += len(message)
+                    ready = True
+                else:
+                    if self.drop_on_backpressure:
+                        if (self._queued_bytes > self.SEND_QUEUE_MAX_BYTES or
+                                (self._send_queue and
+                                 time.monotonic() - self._last_drain > self.SEND_STALL_TIMEOUT)):
+                            self.dropped_packets += 1
+                            return
+                    else:
+                        while self._queued_bytes > self.SEND_QUEUE_MAX_BYTES and not self._flush_stop.is_set():
+                            self._send_space.wait(0.1)
+                    ready = False
+                    if not self._send_buf:
+                        now = time.monotonic()
+                        # Not part of a burst, so there is nothing to wait for
+                        ready = now - self._last_queued > self.SEND_BUFFER_MAX_DELAY
+                        self._send_deadline = now + self.SEND_BUFFER_MAX_DELAY
+                    self._send_buf += message
+                    self._queued_bytes += len(message)
+                    ready = ready or len(self._send_buf) >= self.SEND_BUFFER_MAX_BYTES
+                    if ready:
+                        self._queue_send_buffer()
+            if ready:
+                self._send_wakeup.set()
+
             # Log packet stats every 100 packets or every 10 seconds, but only if debug is enabled
-            if self.debug and (self.packet_count % 100 == 0 or now - self.last_packet_time > 10):
-                packet_size = len(message) if isinstance(message, bytes) else len(message.encode('utf-8'))
-                logger.info(f"Sent audio packet #{self.packet_count}, size: {packet_size} bytes")
-                self.last_packet_time = now
-                
-            self.client_socket.send(message, websocket.ABNF.OPCODE_BINARY)
+            if self.debug and self._log_enabled(logging.INFO):
+                self.packet_count += 1
+                now = time.monotonic()
+                packet_times = self.packet_times
+                packet_times.append(now)
+                if self.packet_count % 100 == 0 or now - self.last_packet_time > 10:
+                    window = packet_times[-1] - packet_times[0]
+                    rate = (len(packet_times) - 1) / window if window > 0 else 0.0
+                    # Packets are always bytes, either audio or the encoded END_OF_AUDIO marker
+                    self._log_info(
+                        "Sent audio packet #%d, size: %d bytes, rate: %.1f packets/s, dropped: %d",
+                        self.packet_count, len(message), rate, self.dropped_packets
+                    )
+                    self.last_packet_time = now
         except Exception as e:
-            logger.error(f"Error sending packet: {e}")
+            logger.error("Error sending packet: %s", e)
             print(f"[ERROR]: Failed to send audio packet: {e}")
 
+
 class EnhancedTranscriptionClient(TranscriptionClient):
     """Enhanced transcription client that uses the EnhancedClient."""
     
@@ -190,6 +553,16 @@ class EnhancedTranscriptionClient(TranscriptionClient):
         # Replace the client in the clients list
         self.clients = [self.enhanced_client]
         
+    def record(self):
+        """Record from the microphone, dropping audio rather than queueing it if the server falls behind."""
+        for client in self.clients:
+            client.drop_on_backpressure = True
+        try:
+            return super().record()
+        finally:
+            for client in self.clients:
+                client.drop_on_backpressure = False
+
     def __call__(self, *args, **kwargs):
         # Start a thread to monitor connection status
         self._start_connection_monitor()
@@ -198,14 +571,10 @@ class EnhancedTranscriptionClient(TranscriptionClient):
     def _start_connection_monitor(self):
         """Start a thread to monitor connection status."""
         def monitor():
-            start_time = time.time()
             try:
-                while not self.enhanced_client.connected and time.time() - start_time < 30:
-                    time.sleep(1)
-                    if time.time() - start_time > 10 and not self.enhanced_client.connected:
-                        print("\n[WARNING]: Still waiting for server connection... Is the server running?")
-                        print(f"[INFO]: Make sure the server is running on ws://{self.host}:{self.port}")
-                        break
+                if not self.enhanced_client.ready_event.wait(timeout=10):
+                    print("\n[WARNING]: Still waiting for server connection... Is the server running?")
+                    print(f"[INFO]: Make sure the server is running on ws://{self.host}:{self.port}")
             except Exception as e:
                 logger.error(f"Error in connection monitor: {e}")
                 print(f"[ERROR] in connection monitor: {e}")